@@ -15,6 +15,8 @@ from furl import furl
 from condarepo.package import Package, RepoData
 from condarepo.pidfile import PidFile
 from condarepo.report import Report
+from condarepo import profiling
+from condarepo.profiling import timed
 
 def download(p, timeout_sec):
     log = logging.getLogger("condarepo")
@@ -34,6 +36,8 @@ def main():
     parser.add_argument('-p', "--pidfile",  default=None, help="File path for file containing process id")
     parser.add_argument('-o', "--timeout",  default=10, type=float, help="HTTP network connnection timeout seconds")
     parser.add_argument('-r', "--resumedownload",  default=False, action='store_true', help="Resume previous download using HTTP header Range")
+    parser.add_argument("--profile",  default=False, action='store_true', help="Profile the run with cProfile (main process and every worker) and time the hot paths")
+    parser.add_argument("--profile-dir",  default="condarepo-profile", help="Directory for per-process and merged .pstats files, default condarepo-profile")
     parser.add_argument("architecture", help="Architecture, one of the follwings: win-64, linux-64,...")
     parser.add_argument("downloaddir", help="Download directory")
 
@@ -54,6 +58,27 @@ def main():
 
     log = logging.getLogger("condarepo")
 
+    if not args.profile:
+        mirror(args)
+        return
+
+    profiling.clean(args.profile_dir)
+    profiler = profiling.Profiler(args.profile_dir, prefix="main")
+    profiler.start()
+    log.info("Profiling enabled, stats will be written in %s", args.profile_dir)
+    # dump and merge also when the run fails or exits early, those are the runs worth profiling
+    try:
+        mirror(args)
+    finally:
+        profiler.stop()
+        profiler.dump()
+        stats, total = profiling.merge(args.profile_dir)
+        profiling.log_report(stats, total, profiling.import_times())
+
+
+def mirror(args):
+    log = logging.getLogger("condarepo")
+
     start_time = datetime.now()
     architecture = args.architecture
     keeppackages = args.keeppackages
@@ -86,43 +111,44 @@ def main():
         log.fatal("Cannot download %s index file from repository", r.url())
         sys.exit(1)
 
-    with open(r.local_filepath()) as data_file:
+    with timed("repodata_parse"), open(r.local_filepath()) as data_file:
         repo_data = json.load(data_file)
     remote_pkgs = repo_data['packages']
     log.info("%s contains %s packages refs", r.local_filepath(), len(remote_pkgs))
 
-    # look for ".tmp-download" left over files unless use resume download
-    for f in download_dir.glob(Package.TMP_FILE_EXT):
-        if not resume_download:
-            f.unlink()
-            log.warning("Presumably previous run of condarepo was abruptly aborted, found and deleted uncompleted tmp download files %s", f)
-        else:
-            log.info("Do not erase previous uncompleted download %s, will try to resume", f)
-
-    # count local pkgs
-    local_pkgs = [Path(f) for f in download_dir.glob('*') if f.suffix != ".json" and Path(f).is_file()]
-
-    # delete stale pkgs
-    stale_pkgs = []
-    for f in local_pkgs:
-        # do not delete tmp file download, if are still here a resume was requested
-        if f.suffix == Package.TMP_FILE_EXT:
-            continue
-        if f.name not in remote_pkgs.keys():
-            stale_pkgs.append(f)
-            if not keeppackages:
+    with timed("directory_scan"):
+        # look for ".tmp-download" left over files unless use resume download
+        for f in download_dir.glob(Package.TMP_FILE_EXT):
+            if not resume_download:
                 f.unlink()
-                log.info("Delete local package %s as it is no longer included in remote repository", f)
+                log.warning("Presumably previous run of condarepo was abruptly aborted, found and deleted uncompleted tmp download files %s", f)
             else:
-                log.warning("Local package %s is no longer included in remote repository but is kept locally", f)
-    if len(stale_pkgs)==0:
-        log.info("All local packages are included in remote repository")
-    else:
-        log.info("Deleted %s local package no longer included in remote repository", len(stale_pkgs))
+                log.info("Do not erase previous uncompleted download %s, will try to resume", f)
+
+        # count local pkgs
+        local_pkgs = [Path(f) for f in download_dir.glob('*') if f.suffix != ".json" and Path(f).is_file()]
+
+        # delete stale pkgs
+        stale_pkgs = []
+        for f in local_pkgs:
+            # do not delete tmp file download, if are still here a resume was requested
+            if f.suffix == Package.TMP_FILE_EXT:
+                continue
+            if f.name not in remote_pkgs.keys():
+                stale_pkgs.append(f)
+                if not keeppackages:
+                    f.unlink()
+                    log.info("Delete local package %s as it is no longer included in remote repository", f)
+                else:
+                    log.warning("Local package %s is no longer included in remote repository but is kept locally", f)
+        if len(stale_pkgs)==0:
+            log.info("All local packages are included in remote repository")
+        else:
+            log.info("Deleted %s local package no longer included in remote repository", len(stale_pkgs))
 
-    # recompute local pkgs after stale ones have been deleted
-    local_pkgs = [f for f in local_pkgs if f not in stale_pkgs]
-    local_pkgs_exclude_tmp = [f for f in local_pkgs if f.suffix != Package.TMP_FILE_EXT]
+        # recompute local pkgs after stale ones have been deleted
+        local_pkgs = [f for f in local_pkgs if f not in stale_pkgs]
+        local_pkgs_exclude_tmp = [f for f in local_pkgs if f.suffix != Package.TMP_FILE_EXT]
 
     # count pkgs on disk
     num_local_pkgs = len(local_pkgs_exclude_tmp)
@@ -132,15 +158,23 @@ def main():
     log.info("Packages to download %s", (num_remote_pkgs-num_local_pkgs))
 
     # start download
-    p = Pool(optimal_thread_count)
-    remote_pkgs = [Package(str(repo_url), name, local_dir=download_dir, resume_download=resume_download, **remote_pkgs[name]) for name in remote_pkgs]
+    if args.profile:
+        p = Pool(optimal_thread_count, initializer=profiling.init_worker, initargs=(args.profile_dir,))
+    else:
+        p = Pool(optimal_thread_count)
+    with timed("download_planning"):
+        remote_pkgs = [Package(str(repo_url), name, local_dir=download_dir, resume_download=resume_download, **remote_pkgs[name]) for name in remote_pkgs]
     download_func = functools.partial(download, timeout_sec=timeout_sec)
     downloaded = p.map(download_func, remote_pkgs)
+    # close and join so that workers exit normally and, when profiling, dump their stats
+    p.close()
+    p.join()
 
     end_time = datetime.now()
 
     # prepare for reporting
-    r = Report(download_dir, downloaded, num_remote_pkgs, num_local_pkgs, start_time, end_time)
+    with timed("report"):
+        r = Report(download_dir, downloaded, num_remote_pkgs, num_local_pkgs, start_time, end_time)
     r.text_report("condarepo")
     r.csv_report("condarepo.report")
 
@@ -11,6 +11,8 @@ import humanize
 import requests
 from requests.exceptions import RequestException
 
+from condarepo.profiling import timed
+
 log = logging.getLogger("condarepo")
 
 class Status():
@@ -117,6 +119,7 @@ class Package():
         self._resume_download = resume_download
 
 
+    @timed("package_url")
     def url(self):
         return str(self._base_url.copy().join(self.filename))
 
@@ -161,15 +164,17 @@ class Package():
                             )
                             resume_header = {'Range': 'bytes=%d-' % self.tmp_file_size()}
                             log.debug("Add HTTP header %s for URL %s", str(resume_header), self.url())
-                    r = requests.get(self.url(), stream=True, timeout=timeout_sec, headers=resume_header)
+                    with timed("http_request"):
+                        r = requests.get(self.url(), stream=True, timeout=timeout_sec, headers=resume_header)
                     if r.status_code == 200 or r.status_code == 206:
-                        with open(self.local_tmp_filepath(), 'wb' if resume_header == {} else 'ab') as f:
+                        with timed("network_transfer"), open(self.local_tmp_filepath(), 'wb' if resume_header == {} else 'ab') as f:
                             r.raw.decode_content = True
                             shutil.copyfileobj(r.raw, f)
                         t2 = datetime.utcnow()
                         self._duration = t2 - t1
                         if self.md5_ok():
-                            shutil.move(self.local_tmp_filepath(), self.local_filepath())
+                            with timed("shutil_move"):
+                                shutil.move(self.local_tmp_filepath(), self.local_filepath())
                             log.info("File %s downloaded, size %s (%s), MD5 is OK", self.local_filepath(), self.file_size(), self.human_file_size())
                             self._state = DownloadOK()
                             done = True
@@ -203,6 +208,7 @@ class Package():
     def download_dir(self):
         return self._local_dir
 
+    @timed("md5")
     def md5(self):
         hash_md5 = hashlib.md5()
         with open(self.local_tmp_filepath(), "rb") as f:
@@ -0,0 +1,198 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import functools
+import subprocess
+from pathlib import Path
+from multiprocessing import util
+
+log = logging.getLogger("condarepo")
+
+PSTATS_EXT = ".pstats"
+TIMERS_EXT = ".timers.json"
+MERGED_BASENAME = "condarepo"
+IMPORT_MODULES = ["furl", "requests", "humanize", "yaml"]
+
+_enabled = False
+_stats = {}
+# cProfile.Profile running in this process, inherited by forked Pool workers
+_active_profile = None
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    _stats.clear()
+
+
+def add_time(name, seconds):
+    calls, total = _stats.get(name, (0, 0.0))
+    _stats[name] = (calls + 1, total + seconds)
+
+
+def timers():
+    return dict(_stats)
+
+
+class timed():
+    """Accumulate wall clock time spent in a block or function, no-op unless profiling is enabled."""
+
+    def __init__(self, name):
+        self.name = name
+        self._starts = []
+
+    def __enter__(self):
+        if _enabled:
+            self._starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._starts:
+            add_time(self.name, time.perf_counter() - self._starts.pop())
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Profiler():
+    """cProfile plus hot path timers for the current process, dumped as <prefix>-<pid> files in output_dir."""
+
+    def __init__(self, output_dir, prefix="process"):
+        self._output_dir = Path(output_dir)
+        self._prefix = prefix
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        global _active_profile
+        reset()
+        enable()
+        self._profile.enable()
+        _active_profile = self._profile
+
+    def stop(self):
+        global _active_profile
+        self._profile.disable()
+        _active_profile = None
+        disable()
+
+    def dump(self):
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        basename = "{}-{}".format(self._prefix, os.getpid())
+        self._profile.dump_stats(str(self._output_dir / (basename + PSTATS_EXT)))
+        with open(str(self._output_dir / (basename + TIMERS_EXT)), "w") as f:
+            json.dump(timers(), f)
+
+
+def init_worker(output_dir):
+    """Pool initializer: profile the worker until it exits, then dump its stats."""
+    # a forked worker inherits the parent profiler, and since python 3.12 only one can be active per process
+    if _active_profile is not None:
+        _active_profile.disable()
+    profiler = Profiler(output_dir, prefix="worker")
+    profiler.start()
+    # run by multiprocessing when the worker exits normally (i.e. after Pool.close() and Pool.join())
+    util.Finalize(None, _stop_and_dump, args=(profiler,), exitpriority=10)
+
+
+def _stop_and_dump(profiler):
+    profiler.stop()
+    profiler.dump()
+
+
+def clean(output_dir):
+    """Delete dumps left over by a previous profiled run, so they are not merged again."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for f in list(output_dir.glob("*" + PSTATS_EXT)) + list(output_dir.glob("*" + TIMERS_EXT)):
+        f.unlink()
+
+
+def merge(output_dir):
+    """Merge every per-process dump in output_dir, return (pstats.Stats or None, timers dict)."""
+    output_dir = Path(output_dir)
+    merged_pstats = output_dir / (MERGED_BASENAME + PSTATS_EXT)
+    merged_timers = output_dir / (MERGED_BASENAME + TIMERS_EXT)
+    stats = None
+    for f in sorted(output_dir.glob("*" + PSTATS_EXT)):
+        if f == merged_pstats:
+            continue
+        if stats is None:
+            stats = pstats.Stats(str(f))
+        else:
+            stats.add(str(f))
+    total = {}
+    for f in sorted(output_dir.glob("*" + TIMERS_EXT)):
+        if f == merged_timers:
+            continue
+        with open(str(f)) as tf:
+            for name, (calls, seconds) in json.load(tf).items():
+                c, s = total.get(name, (0, 0.0))
+                total[name] = (c + calls, s + seconds)
+    if stats is not None:
+        stats.dump_stats(str(merged_pstats))
+    with open(str(merged_timers), "w") as f:
+        json.dump(total, f)
+    return stats, total
+
+
+def import_times(modules=IMPORT_MODULES):
+    """Return cumulative import time in seconds of each module, each measured in its own fresh interpreter."""
+    # lines look like "import time:       123 |       4567 | requests"
+    pattern = re.compile(r"^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S.*)$")
+    times = {}
+    for module in modules:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if result.returncode != 0:
+            errors = result.stderr.strip().splitlines()
+            log.warning("Cannot measure import time of %s, import failed: %s", module, errors[-1] if errors else result.returncode)
+            continue
+        for line in result.stderr.splitlines():
+            m = pattern.match(line)
+            if m is not None and m.group(2) == module:
+                times[module] = int(m.group(1)) / 1e6
+        if module not in times:
+            log.warning("Cannot measure import time of %s, no -X importtime output (python 3.7 or later is required)", module)
+    return times
+
+
+def log_report(stats, total, imports, top=25):
+    for m in sorted(imports):
+        log.info("Import time %-40s %.4f seconds", m, imports[m])
+    for name in sorted(total, key=lambda n: total[n][1], reverse=True):
+        calls, seconds = total[name]
+        log.info("Hot path %-30s calls %-10s total %.4f seconds, mean %.6f seconds",
+                 name, calls, seconds, seconds / calls if calls else 0.0)
+    if stats is not None:
+        stream = stats.stream
+        try:
+            stats.stream = io.StringIO()
+            stats.sort_stats("cumulative").print_stats(top)
+            log.info("Merged cProfile stats, top %s by cumulative time:\n%s", top, stats.stream.getvalue())
+        finally:
+            stats.stream = stream
@@ -2,6 +2,7 @@ import logging
 
 import humanize
 from condarepo.utils import get_tree_size
+from condarepo.profiling import timed
 
 
 class Report():
@@ -14,7 +15,8 @@ class Report():
         self.num_local_pkgs_after = len([f for f in download_dir.glob('*') if f.suffix != ".json"])
         self.num_file_downloaded = sum([1 for p in downloaded if p.was_downloaded()])
         self.num_transfer_error = sum([1 for p in downloaded if p.transfer_error()])
-        self.dir_size = get_tree_size(download_dir)
+        with timed("get_tree_size"):
+            self.dir_size = get_tree_size(download_dir)
         self.errors = {}
         for e in [str(p.state()) for p in downloaded if p.transfer_error()]:
             self.errors[e] = self.errors.get(e, 0) + 1
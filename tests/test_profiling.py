@@ -0,0 +1,83 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from multiprocessing import Pool
+
+from condarepo import profiling
+from condarepo.profiling import timed
+
+
+@timed("task")
+def task(x):
+    return sum(range(x))
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = Path(tempfile.mkdtemp(prefix="condarepo"))
+        profiling.reset()
+
+    def test_timed_disabled_is_noop(self):
+        @timed("noop")
+        def f(x):
+            return x + 1
+        self.assertEqual(2, f(1))
+        self.assertEqual({}, profiling.timers())
+
+    def test_timed_enabled(self):
+        profiling.enable()
+        try:
+            @timed("decorated")
+            def f(x):
+                return x + 1
+            f(1)
+            f(2)
+            with timed("block"):
+                pass
+        finally:
+            profiling.disable()
+        self.assertEqual(2, profiling.timers()["decorated"][0])
+        self.assertEqual(1, profiling.timers()["block"][0])
+
+    def test_dump_and_merge(self):
+        for prefix in ["main", "worker"]:
+            p = profiling.Profiler(self.output_dir, prefix=prefix)
+            p.start()
+            with timed("block"):
+                sum(range(1000))
+            p.stop()
+            p.dump()
+        stats, total = profiling.merge(self.output_dir)
+        self.assertIsNotNone(stats)
+        self.assertEqual(2, total["block"][0])
+        self.assertTrue((self.output_dir / "condarepo.pstats").exists())
+
+    def test_pool_workers(self):
+        main = profiling.Profiler(self.output_dir, prefix="main")
+        main.start()
+        try:
+            p = Pool(2, initializer=profiling.init_worker, initargs=(str(self.output_dir),))
+            p.map(task, [1000] * 10)
+            p.close()
+            p.join()
+        finally:
+            main.stop()
+        main.dump()
+        stats, total = profiling.merge(self.output_dir)
+        self.assertIsNotNone(stats)
+        self.assertTrue(len(list(self.output_dir.glob("worker-*.pstats"))) > 0)
+        self.assertEqual(10, total["task"][0])
+
+    def test_clean(self):
+        p = profiling.Profiler(self.output_dir)
+        p.start()
+        p.stop()
+        p.dump()
+        profiling.clean(self.output_dir)
+        self.assertEqual([], list(self.output_dir.iterdir()))
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.reset()
+        shutil.rmtree(str(self.output_dir))